@@ -0,0 +1,251 @@
+# context_assembler.py
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List
+import tiktoken
+from config import model_name
+from langchain.callbacks.manager import CallbackManagerForRetrieverRun
+from langchain.schema import BaseRetriever, Document
+
+
+SHINGLE_SIZE = 5  # Words per shingle when fingerprinting chunks
+DUPLICATE_THRESHOLD = 0.8  # Fraction of a chunk's shingles already seen for it to count as a near-duplicate
+MIN_OVERLAP_LINE_LENGTH = 8  # Shorter lines (blank lines, lone brackets, etc.) don't mark an overlap window
+BM25_K1 = 1.5
+BM25_B = 0.75
+TOKEN_PATTERN = re.compile(r"[A-Za-z0-9_]+")
+
+
+@lru_cache(maxsize=1)
+def get_encoding():
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text):
+    return len(get_encoding().encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text, max_tokens):
+    encoding = get_encoding()
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max(max_tokens, 0)])
+
+
+def tokenize(text):
+    return [token.lower() for token in TOKEN_PATTERN.findall(text)]
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    # Hashed word n-grams; short texts fall back to a single shingle of all their words
+    words = tokenize(text)
+    if len(words) < size:
+        return {hash(tuple(words))} if words else set()
+    return {hash(tuple(words[i:i + size])) for i in range(len(words) - size + 1)}
+
+
+def strip_overlap(text, seen_lines):
+    # Trim the leading/trailing lines a chunk shares with already-kept chunks (the splitter's overlap windows)
+    lines = text.split("\n")
+
+    def is_overlap(line):
+        stripped = line.strip()
+        return not stripped or (len(stripped) >= MIN_OVERLAP_LINE_LENGTH and stripped in seen_lines)
+
+    start, end = 0, len(lines)
+    while start < end and is_overlap(lines[start]):
+        start += 1
+    while end > start and is_overlap(lines[end - 1]):
+        end -= 1
+    return "\n".join(lines[start:end])
+
+
+def remove_near_duplicates(texts) -> List[int]:
+    # Returns the indices of texts to keep, in their original order
+    kept = []
+    seen_shingles = set()
+    for i, text in enumerate(texts):
+        text_shingles = shingles(text)
+        if not text_shingles:
+            continue
+        containment = len(text_shingles & seen_shingles) / len(text_shingles)
+        if containment >= DUPLICATE_THRESHOLD:
+            continue
+        kept.append(i)
+        seen_shingles |= text_shingles
+    return kept
+
+
+def bm25_scores(query, texts) -> List[float]:
+    # Cheap local relevance scorer; IDF is computed over the candidate texts themselves
+    query_terms = set(tokenize(query))
+    tokenized = [tokenize(text) for text in texts]
+    if not query_terms or not tokenized:
+        return [0.0] * len(texts)
+    avg_length = sum(len(tokens) for tokens in tokenized) / len(tokenized) or 1.0
+    doc_freq = Counter(term for tokens in tokenized for term in set(tokens) & query_terms)
+    scores = []
+    for tokens in tokenized:
+        term_freq = Counter(tokens)
+        score = 0.0
+        for term in query_terms:
+            if term_freq[term] == 0:
+                continue
+            idf = math.log(1 + (len(texts) - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * len(tokens) / avg_length)
+            score += idf * term_freq[term] * (BM25_K1 + 1) / (term_freq[term] + norm)
+        scores.append(score)
+    return scores
+
+
+def rank_texts(query, texts, dedupe=True) -> List[int]:
+    # Dedupe then rerank. Returns the indices of the surviving texts, best first.
+    kept = remove_near_duplicates(texts) if dedupe else list(range(len(texts)))
+    scores = bm25_scores(query, [texts[i] for i in kept])
+    # Stable sort, so ties keep the vector store's ordering
+    return [i for _, i in sorted(zip(scores, kept), key=lambda pair: -pair[0])]
+
+
+def pack_texts(query, texts, token_budget, dedupe=True) -> List[int]:
+    # Dedupe, rerank, then greedily pack the best texts into the budget. Returns indices in ranked order.
+    ranked = rank_texts(query, texts, dedupe)
+    packed = []
+    used = 0
+    for i in ranked:
+        tokens = count_tokens(texts[i])
+        if used + tokens <= token_budget:
+            packed.append(i)
+            used += tokens
+    return packed
+
+
+def assemble_documents(query, docs, token_budget) -> List[Document]:
+    # Context assembly for a helper bot's retrieved chunks. Overlap windows are only trimmed against chunks
+    # from the same file that have already been packed, so shared lines are never dropped from the context.
+    ranked = rank_texts(query, [doc.page_content for doc in docs])
+    packed_docs = []
+    packed_lines = {}  # Lines of the packed chunks, by source file
+    used = 0
+    for i in ranked:
+        source = docs[i].metadata.get("source")
+        seen_lines = packed_lines.setdefault(source, set()) if source is not None else set()
+        content = strip_overlap(docs[i].page_content, seen_lines)
+        if not content:
+            continue
+        tokens = count_tokens(content)
+        if used + tokens <= token_budget:
+            packed_docs.append(Document(page_content=content, metadata=docs[i].metadata))
+            seen_lines.update(line.strip() for line in content.split("\n"))
+            used += tokens
+    if not packed_docs and ranked:
+        # Nothing fits (e.g. a small per-repo share of the budget), so keep the best chunk cut down to size
+        best = docs[ranked[0]]
+        packed_docs.append(Document(page_content=truncate_to_tokens(best.page_content, token_budget),
+                                    metadata=best.metadata))
+    return packed_docs
+
+
+def split_paragraphs(text) -> List[str]:
+    # Split Markdown on blank lines, keeping each fenced code block together as a single paragraph
+    paragraphs = []
+    lines = []
+    in_fence = False
+    for line in text.split("\n"):
+        if line.strip().startswith("```"):
+            in_fence = not in_fence
+        if not line.strip() and not in_fence:
+            if lines:
+                paragraphs.append("\n".join(lines).strip())
+                lines = []
+            continue
+        lines.append(line)
+    if lines:
+        paragraphs.append("\n".join(lines).strip())
+    return [paragraph for paragraph in paragraphs if paragraph]
+
+
+def close_fences(text):
+    # Close a code fence left open by truncation
+    return text + "\n```" if text.count("```") % 2 else text
+
+
+def fair_shares(token_counts, token_budget) -> Dict[str, int]:
+    # Split the budget evenly, handing what small entries don't need to the larger ones
+    shares = {}
+    remaining_budget = token_budget
+    remaining = sorted(token_counts.items(), key=lambda item: item[1])
+    while remaining:
+        share = remaining_budget // len(remaining)
+        name, needed = remaining.pop(0)
+        shares[name] = min(needed, share)
+        remaining_budget -= shares[name]
+    return shares
+
+
+def remove_cross_repo_duplicates(repo_paragraphs, repos_to_dedupe) -> Dict[str, List[str]]:
+    # Drop paragraphs of the given repos that repeat another repo's. Each repo keeps its first paragraph,
+    # so e.g. two repos both saying they found nothing are both still heard from.
+    deduped = dict(repo_paragraphs)
+    for repo in repos_to_dedupe:
+        other_shingles = set()
+        for other_repo, ps in deduped.items():
+            if other_repo != repo:
+                for paragraph in ps:
+                    other_shingles |= shingles(paragraph)
+        kept = deduped[repo][:1]
+        for paragraph in deduped[repo][1:]:
+            paragraph_shingles = shingles(paragraph)
+            if not paragraph_shingles:
+                continue
+            if len(paragraph_shingles & other_shingles) / len(paragraph_shingles) < DUPLICATE_THRESHOLD:
+                kept.append(paragraph)
+        deduped[repo] = kept
+    return deduped
+
+
+def assemble_repo_statements(prompt, repo_statements, token_budget) -> Dict[str, str]:
+    # Context assembly for the final synthesis. Statements within their fair share of the budget pass through
+    # untouched. The others first lose paragraphs repeated in other repos' statements, then keep their most
+    # relevant paragraphs (in their original order) that fit their share.
+    token_counts = {repo: count_tokens(statement) for repo, statement in repo_statements.items()}
+    shares = fair_shares(token_counts, token_budget)
+    over_budget = [repo for repo in repo_statements if token_counts[repo] > shares[repo]]
+    if not over_budget:
+        return dict(repo_statements)
+    repo_paragraphs = {repo: split_paragraphs(statement) for repo, statement in repo_statements.items()}
+    repo_paragraphs = remove_cross_repo_duplicates(repo_paragraphs, over_budget)
+    for repo in over_budget:
+        token_counts[repo] = count_tokens("\n\n".join(repo_paragraphs[repo]))
+    shares = fair_shares(token_counts, token_budget)
+    assembled = {}
+    for repo, statement in repo_statements.items():
+        ps = repo_paragraphs[repo]
+        if repo not in over_budget:
+            assembled[repo] = statement
+        elif token_counts[repo] <= shares[repo]:
+            assembled[repo] = "\n\n".join(ps)
+        else:
+            # Within one repo's statement, only packing drops paragraphs (similar ones may differ in what matters)
+            packed = sorted(pack_texts(prompt, ps, shares[repo], dedupe=False))
+            if packed:
+                assembled[repo] = "\n\n".join(ps[i] for i in packed)
+            else:
+                # Not even one paragraph fits, so cut the statement itself down to size
+                assembled[repo] = close_fences(truncate_to_tokens("\n\n".join(ps), shares[repo]))
+    return assembled
+
+
+class AssembledRetriever(BaseRetriever):
+    # Wraps a vector store retriever so its chunks go through context assembly before being stuffed into a prompt
+    retriever: BaseRetriever
+    token_budget: int
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        docs = self.retriever.get_relevant_documents(query, callbacks=run_manager.get_child())
+        return assemble_documents(query, docs, self.token_budget)
@@ -1,8 +1,10 @@
 # helper_bot.py
 import os
-from config import model_name, deeplake_username
+from config import model_name, deeplake_username, retrieval_token_budget
 import deeplake
 from deeplake.util.exceptions import DatasetHandlerError
+from bot.context_assembler import AssembledRetriever
+from bot.retrieval_prefetcher import PrefetchedRetriever
 from langchain.chat_models import ChatOpenAI
 from langchain.chains import ConversationalRetrievalChain
 from langchain.document_loaders.generic import GenericLoader
@@ -76,7 +78,10 @@ def clone_github_repo(github_url, local_path):
 
 
 class HelperBot:
+    KEYWORDS = []  # Aliases of the package name, used to speculatively prefetch retrievals
+
     def __init__(self, package_name, github_url, suffixes=[".py"], use_local_vector_store=True):
+        self.package_name = package_name
         if use_local_vector_store:
             dataset_path = f"vector_store/{package_name}"
         else:
@@ -86,11 +91,29 @@ class HelperBot:
             store_vector_embeddings(package_name, github_url, suffixes, use_local_vector_store)
         self.repo_ds = DeepLake(dataset_path=dataset_path, read_only=True, embedding=EMBEDDINGS)
 
-    def get_qa_chain(self, distance_metric='cos', fetch_k=100, maximal_marginal_relevance=True, k=10):
+    @staticmethod
+    def get_search_kwargs(distance_metric='cos', fetch_k=100, maximal_marginal_relevance=True, k=10):
+        return {
+            'distance_metric': distance_metric,
+            'fetch_k': fetch_k,
+            'maximal_marginal_relevance': maximal_marginal_relevance,
+            'k': k
+        }
+
+    def search_by_vector(self, embedding, **search_kwargs):
+        # Same search the QA chain's retriever runs, but for an already-embedded query
+        return self.repo_ds.similarity_search_by_vector(embedding, **self.get_search_kwargs(**search_kwargs))
+
+    def get_qa_chain(self, distance_metric='cos', fetch_k=100, maximal_marginal_relevance=True, k=10,
+                     token_budget=retrieval_token_budget, prefetcher=None, return_source_documents=False):
         retriever = self.repo_ds.as_retriever()
-        retriever.search_kwargs['distance_metric'] = distance_metric
-        retriever.search_kwargs['fetch_k'] = fetch_k
-        retriever.search_kwargs['maximal_marginal_relevance'] = maximal_marginal_relevance
-        retriever.search_kwargs['k'] = k
-        qa = ConversationalRetrievalChain.from_llm(ChatOpenAI(model=model_name), retriever=retriever)
+        retriever.search_kwargs.update(self.get_search_kwargs(distance_metric, fetch_k, maximal_marginal_relevance, k))
+        if prefetcher is not None:
+            # Serve the search from a speculative prefetch when one matches the query
+            retriever = PrefetchedRetriever(retriever=retriever, prefetcher=prefetcher, repo_name=self.package_name,
+                                            search_kwargs=retriever.search_kwargs)
+        # Dedupe, rerank and pack the retrieved chunks into `token_budget` before they're stuffed into the prompt
+        retriever = AssembledRetriever(retriever=retriever, token_budget=token_budget)
+        qa = ConversationalRetrievalChain.from_llm(ChatOpenAI(model=model_name), retriever=retriever,
+                                                   return_source_documents=return_source_documents)
         return qa
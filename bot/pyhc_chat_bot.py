@@ -1,5 +1,6 @@
 # pyhc_chat_bot.py
-from config import model_name
+from config import model_name, synthesis_token_budget
+from bot.context_assembler import assemble_repo_statements
 from langchain.chat_models import ChatOpenAI
 from langchain.schema import HumanMessage, SystemMessage, AIMessage
 
@@ -26,6 +27,8 @@ def let_pyhc_chat_answer(chat_history, prompt):
 def answer_with_context(chat_history, prompt, repo_statements):
     # The main function to incorporate context from the vector store into PyHC-Chat's response to a user's prompt
     chat = ChatOpenAI(model_name=model_name)
+    # Drop repeated paragraphs and fit each repo's statement into its fair share of the synthesis budget
+    repo_statements = assemble_repo_statements(prompt, repo_statements, synthesis_token_budget)
     chat_list = [pyhc_chat_system_message()] + chat_history + [HumanMessage(content=f"""
 To best address the user's inquiry, use the information provided below which was retrieved from the vector store:
 
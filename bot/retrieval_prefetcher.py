@@ -0,0 +1,148 @@
+# retrieval_prefetcher.py
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List
+from langchain.callbacks.manager import CallbackManagerForRetrieverRun
+from langchain.schema import BaseRetriever, Document
+
+
+def predict_relevant_repos(prompt, bots) -> List[str]:
+    # Cheap local stand-in for RepoSelectorBot: the repos whose names (or aliases) appear in the prompt
+    prompt = prompt.lower()
+    predicted_repos = []
+    for repo, bot in bots.items():
+        names = {repo.lower()} | {alias.lower() for alias in bot.KEYWORDS}
+        if any(re.search(rf"\b{re.escape(name)}\b", prompt) for name in names):
+            predicted_repos.append(repo)
+    return predicted_repos
+
+
+class RetrievalPrefetcher:
+    # Embeds the user's prompt and searches the predicted repo while RepoSelectorBot's LLM call is in flight.
+    # Only a single-repo prediction is speculated on: for multi-repo questions the helper bots search with
+    # RepoPrompterBot's questions rather than the prompt, so a prefetched search could never be reused.
+    # A helper bot's retrieval takes the prefetched documents if they were searched for the same query,
+    # otherwise it searches as usual.
+    def __init__(self, bots, embeddings):
+        self.bots = bots
+        self.embeddings = embeddings
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.lock = threading.Lock()
+        self.prompt = None
+        self.start_time = None
+        self.repo = None
+        self.future = None
+        self.cancel_event = None
+        self.discarded_futures = {}  # Discarded prefetches that may still be searching, by repo
+        # Counters (accumulated over the whole session)
+        self.searches_prefetched = 0
+        self.hits = 0
+        self.misses = 0
+        self.wasted = 0
+        self.cancelled = 0
+        self.latency_saved = 0.0
+
+    def start(self, prompt, chat_history) -> List[str]:
+        self.discard()
+        if chat_history:
+            # The QA chains condense follow-up questions with the chat history before searching,
+            # so a search on the raw prompt could never be reused
+            return []
+        self.prompt = prompt
+        self.start_time = time.perf_counter()
+        predicted_repos = predict_relevant_repos(prompt, self.bots)
+        if len(predicted_repos) == 1:
+            self.repo = predicted_repos[0]
+            self.cancel_event = threading.Event()
+            self.future = self.executor.submit(self.prefetch, self.repo, prompt, self.cancel_event)
+            self.searches_prefetched += 1
+        return predicted_repos
+
+    def prefetch(self, repo, prompt, cancel_event):
+        embedding = self.embeddings.embed_query(prompt)
+        if cancel_event.is_set():
+            return None  # The selector disagreed while we were embedding, so skip the search
+        docs = self.bots[repo].search_by_vector(embedding)
+        return docs, time.perf_counter()
+
+    def settle(self, relevant_repos):
+        # Called as soon as the selector answers: drop the prefetch unless it's for the one repo the selector chose
+        if relevant_repos != [self.repo]:
+            self.discard()
+
+    def take(self, repo, query, search_kwargs):
+        # Returns the prefetched documents for this search, or None if there aren't any to reuse
+        if repo == self.repo and (query != self.prompt or search_kwargs != self.bots[repo].get_search_kwargs()):
+            self.discard()
+        # Don't search the same dataset from two threads at once
+        wait(self.discarded_futures.pop(repo, []))
+        if self.prompt is None:
+            return None  # Not speculating this turn
+        if repo != self.repo:
+            self.misses += 1
+            return None
+        future = self.future
+        self.repo, self.future, self.cancel_event = None, None, None
+        take_time = time.perf_counter()
+        try:
+            docs, done_time = future.result()
+        except Exception:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # A regular search would have started now; the prefetch only makes us wait for whatever it had left
+        self.latency_saved += (done_time - self.start_time) - max(0.0, done_time - take_time)
+        return docs
+
+    def discard(self):
+        # Cancel the prefetch if its search hasn't started yet, otherwise count it as wasted work
+        if self.future is not None:
+            self.cancel_event.set()
+            if self.future.cancel():
+                self.count_discarded(searched=False)
+            else:
+                self.discarded_futures.setdefault(self.repo, []).append(self.future)
+                self.future.add_done_callback(self.count_discarded_future)
+        self.repo, self.future, self.cancel_event = None, None, None
+
+    def count_discarded_future(self, future):
+        # A prefetch that returned None skipped its search after being cancelled mid-embedding
+        self.count_discarded(searched=future.exception() is not None or future.result() is not None)
+
+    def count_discarded(self, searched):
+        with self.lock:
+            if searched:
+                self.wasted += 1
+            else:
+                self.cancelled += 1
+
+    def end_turn(self):
+        self.discard()
+        self.prompt = None
+
+    def hit_rate(self):
+        retrievals = self.hits + self.misses
+        return self.hits / retrievals if retrievals else 0.0
+
+    def summary(self):
+        with self.lock:
+            wasted, cancelled = self.wasted, self.cancelled
+        return (f"{self.hits}/{self.hits + self.misses} retrieval(s) served from prefetch ({self.hit_rate():.0%} hit rate)\n"
+                f"{wasted} wasted and {cancelled} cancelled of {self.searches_prefetched} prefetched search(es)\n"
+                f"{self.latency_saved:.2f}s of latency saved")
+
+
+class PrefetchedRetriever(BaseRetriever):
+    # Wraps a vector store retriever so it can reuse a RetrievalPrefetcher's search for the same query
+    retriever: BaseRetriever
+    prefetcher: Any
+    repo_name: str
+    search_kwargs: Dict[str, Any]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        docs = self.prefetcher.take(self.repo_name, query, self.search_kwargs)
+        if docs is None:
+            docs = self.retriever.get_relevant_documents(query, callbacks=run_manager.get_child())
+        return docs
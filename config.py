@@ -7,3 +7,5 @@ RESET_COLOR = "\033[0m"
 model_name = "gpt-4o"
 secondary_model_name = "gpt-4o-mini"  # "gpt-3.5-turbo"
 deeplake_username = "sapols"
+retrieval_token_budget = 4000  # Max tokens of retrieved chunks stuffed into the helper bots' prompts (split across repos)
+synthesis_token_budget = 3000  # Max tokens of helper bot answers pasted into PyHC-Chat's final prompt (split across repos)
@@ -6,21 +6,24 @@ import time
 import signal
 import threading
 from contextlib import contextmanager
-from config import WHITE, GREEN, BLUE, RED, RESET_COLOR
+from config import WHITE, GREEN, BLUE, RED, RESET_COLOR, retrieval_token_budget
 from bot.pyhc_chat_bot import answer_with_context, let_pyhc_chat_answer
-from bot.helper_bot import HelperBot
+from bot.context_assembler import count_tokens
+from bot.helper_bot import HelperBot, EMBEDDINGS
 from bot.pyhc_bots import *
 from bot.repo_selector_bot import RepoSelectorBot
 from bot.repo_prompter_bot import RepoPrompterBot
+from bot.retrieval_prefetcher import RetrievalPrefetcher
 from langchain.schema import AIMessage, HumanMessage, SystemMessage
 from tqdm import tqdm
 
 
 class PyHCChat:
-    def __init__(self, use_local_vector_store=True, verbose=False):
+    def __init__(self, use_local_vector_store=True, verbose=False, speculative=False):
         self.use_local_vector_store = use_local_vector_store
         self.verbose = verbose
         self.bots = self.load_helper_bots()
+        self.prefetcher = RetrievalPrefetcher(self.bots, EMBEDDINGS) if speculative else None
         self.chat_history = []
         self.stop_event = threading.Event()
         self.thread = None
@@ -42,6 +45,10 @@ class PyHCChat:
                 # Start the animated "Thinking..." in a separate thread
                 self.start_waiting_animation()
 
+                # Speculatively start retrieving from the likely repos while the selector decides
+                if self.prefetcher:
+                    self.prefetcher.start(user_prompt, self.chat_history)
+
                 # Get PyHC-Chat's response
                 relevant_repos = self.get_relevant_repos(user_prompt)
 
@@ -58,6 +65,12 @@ class PyHCChat:
                 # Stop the "Thinking..." animation
                 self.stop_waiting_animation()
 
+                # Drop any prefetched retrievals that went unused
+                if self.prefetcher:
+                    self.prefetcher.end_turn()
+                    if self.verbose:
+                        print(f"{BLUE}\nPREFETCH STATS\n{self.prefetcher.summary()}{RESET_COLOR}\n")
+
                 # Display PyHC-Chat's response
                 print(f"{GREEN}\nANSWER\n{WHITE}{response}{RESET_COLOR}\n")
                 self.chat_history.append(HumanMessage(content=user_prompt))
@@ -65,6 +78,8 @@ class PyHCChat:
             except Exception as e:
                 # Stop the "Thinking..." animation then display the error and move on
                 self.stop_waiting_animation()
+                if self.prefetcher:
+                    self.prefetcher.end_turn()
                 print(f"{RED}An error occurred: {e}{RESET_COLOR}")
 
     # -------------- Helper Functions ----------------------------------------------------------------------------------
@@ -134,6 +149,9 @@ class PyHCChat:
     def get_relevant_repos(self, user_prompt):
         # Determine which vector store datasets to reach into
         relevant_repos = RepoSelectorBot().determine_relevant_repos(self.chat_history, user_prompt)
+        if self.prefetcher:
+            # Stop speculating right away if the selector disagrees
+            self.prefetcher.settle(relevant_repos)
         self.stop_waiting_animation()
         if self.verbose:
             print(f"{BLUE}\nRELEVANT REPO(S)\n{', '.join(relevant_repos)}{RESET_COLOR}\n")
@@ -146,7 +164,7 @@ class PyHCChat:
 
     def chat_with_one_repo(self, user_prompt, repo):
         # Chat with one repo using vector store retrieval
-        qa = self.bots[repo].get_qa_chain()
+        qa = self.bots[repo].get_qa_chain(prefetcher=self.prefetcher)
         # Change "Thinking..." animation to "Searching {repo} contents..."
         self.stop_waiting_animation()
         self.start_waiting_animation(f'Searching {repo} contents')
@@ -170,14 +188,19 @@ class PyHCChat:
                 print(f"{repo}: \"{question}\"\n")
             print(f"{RESET_COLOR}")
         repo_answers = {}
-        for repo, repo_question in repo_questions.items():
-            qa = self.bots[repo].get_qa_chain()
+        # Each repo gets a fair share of the retrieval budget, plus whatever the repos searched before it didn't use
+        remaining_budget = retrieval_token_budget
+        for i, (repo, repo_question) in enumerate(repo_questions.items()):
+            repo_token_budget = remaining_budget // (len(repo_questions) - i)
+            qa = self.bots[repo].get_qa_chain(token_budget=repo_token_budget, prefetcher=self.prefetcher,
+                                              return_source_documents=True)
             # Start "Searching {repo} contents..."
             self.start_waiting_animation(f'Searching {repo} contents')
             # Get helper bot answer
             result = qa({"question": repo_question, "chat_history": self.chat_history})  # TODO: does it need chat_history? Or should we one-shot prompt?
             # Stop animation
             self.stop_waiting_animation()
+            remaining_budget -= sum(count_tokens(doc.page_content) for doc in result['source_documents'])
             # Store answer
             repo_answers[repo] = result['answer']
         if self.verbose:
@@ -200,8 +223,11 @@ if __name__ == "__main__":
                         help='Flag to use an online vector store. Default is to use a local vector store.')
     parser.add_argument('-v', '--verbose', action='store_true',
                         help='Flag for verbose mode. Default is False.')
+    parser.add_argument('-s', '--speculative', action='store_true',
+                        help='Flag to speculatively prefetch vector store retrievals while the relevant repos are '
+                             'being determined. Default is False.')
     # TODO: add a flag to optionally display documents retrieved from the vector store
     args = parser.parse_args()
 
     use_local_vector_store = not args.online_vector_store
-    PyHCChat(use_local_vector_store, args.verbose).chat()
+    PyHCChat(use_local_vector_store, args.verbose, args.speculative).chat()